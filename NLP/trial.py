@@ -1,8 +1,24 @@
 # app.py - Simplified WhatsApp-like Hindi Predictive Typing
 import streamlit as st
-from transformers import pipeline
+import torch
+from transformers import AutoTokenizer, AutoModelForCausalLM, GenerationConfig, StoppingCriteria, StoppingCriteriaList
+from transformers.pytorch_utils import Conv1D
+import os
 import re
-import time
+import string
+
+try:
+    import onnxruntime as ort
+    from optimum.onnxruntime import ORTModelForCausalLM
+except ImportError:  # ONNX Runtime is optional, fall back to PyTorch
+    ort = None
+    ORTModelForCausalLM = None
+
+try:
+    from torch._dynamo.exc import TorchDynamoException
+    _COMPILE_ERRORS = (TorchDynamoException,)  # Includes BackendCompilerFailed
+except ImportError:  # PyTorch without torch.compile
+    _COMPILE_ERRORS = ()
 
 # ------------------------
 # SETTINGS
@@ -10,9 +26,38 @@ import time
 MODEL_NAME = "surajp/gpt2-hindi"
 MAX_NEW_TOKENS = 12
 N_SUGGESTIONS = 4
-TOP_K = 50
-TOP_P = 0.9
-TEMPERATURE = 0.8
+DIVERSITY_PENALTY = 1.0
+DEVICE = torch.device("cpu")
+ONNX_DIR = "./onnx_gpt2_hindi"  # Exported once, reloaded on later starts
+
+# CPUs this process may actually run on (respects affinity/cgroup cpusets)
+try:
+    CPU_THREADS = len(os.sched_getaffinity(0))
+except AttributeError:  # Not available on macOS/Windows
+    CPU_THREADS = os.cpu_count() or 4
+
+@st.cache_resource
+def configure_torch_threads():
+    """Set torch threading once per process rather than on every rerun"""
+    torch.set_num_threads(CPU_THREADS)
+    if torch.get_num_interop_threads() != 1:
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:  # Too late once parallel work has started
+            pass
+
+configure_torch_threads()
+
+# Common punctuation stripped from candidate word ends with str.strip
+# (fast path): ASCII, curly quotes, dashes, ellipsis and invisible marks
+_STRIP_CHARS = string.whitespace + string.punctuation + "“”‘’«»…—–•\u200b\u200c\u200d\u00ad\u00a0"
+
+# Precompiled patterns used on every candidate word and rerun
+_WORD_CHAR_RE = re.compile(r'[\u0900-\u097Fa-zA-Z0-9]')
+_END_STRIP_RE = re.compile(r'^[^\u0900-\u097Fa-zA-Z0-9]+|[^\u0900-\u097Fa-zA-Z0-9]+$')
+_HAS_LETTER_RE = re.compile(r'[\u0900-\u097Fa-zA-Z]')
+_SENT_SPLIT_RE = re.compile(r'[।.!?]+')
+_WORD_SPLIT_RE = re.compile(r'[\s।.!?,;:"\'()\[\]{}]+')
 
 # ------------------------
 # PAGE SETUP
@@ -27,7 +72,7 @@ st.set_page_config(
 # ------------------------
 # CUSTOM CSS
 # ------------------------
-st.markdown("""
+_CSS = """
 <style>
     .stApp {
         background: linear-gradient(135deg, #0d1117 0%, #161b22 100%);
@@ -100,7 +145,8 @@ st.markdown("""
     }
     
     /* Button styling */
-    .stButton > button {
+    .stButton > button,
+    .stFormSubmitButton > button {
         background: linear-gradient(135deg, #238636 0%, #2ea043 100%) !important;
         color: white !important;
         border: none !important;
@@ -111,17 +157,21 @@ st.markdown("""
         box-shadow: 0 4px 12px rgba(37, 211, 102, 0.2) !important;
     }
     
-    .stButton > button:hover {
+    .stButton > button:hover,
+    .stFormSubmitButton > button:hover {
         transform: translateY(-2px) !important;
         box-shadow: 0 6px 20px rgba(37, 211, 102, 0.4) !important;
         background: linear-gradient(135deg, #2ea043 0%, #238636 100%) !important;
     }
     
-    .stButton > button:active {
+    .stButton > button:active,
+    .stFormSubmitButton > button:active {
         transform: translateY(0) !important;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+st.html(_CSS)
 
 # ------------------------
 # TITLE
@@ -132,25 +182,137 @@ st.markdown('<p class="subtitle">WhatsApp जैसा स्मार्ट स
 # ------------------------
 # MODEL LOADING
 # ------------------------
+def conv1d_to_linear(model):
+    """Swap GPT-2's Conv1D projections for nn.Linear so they can be quantized"""
+    converted = set()
+    for name, module in list(model.named_modules()):
+        for child_name, child in module.named_children():
+            if isinstance(child, Conv1D):
+                # Conv1D stores its weight as (in, out), nn.Linear as (out, in)
+                in_features, out_features = child.weight.shape
+                linear = torch.nn.Linear(in_features, out_features)
+                linear.weight.data = child.weight.data.t().contiguous()
+                linear.bias.data = child.bias.data
+                setattr(module, child_name, linear)
+                converted.add(f"{name}.{child_name}" if name else child_name)
+    return converted
+
 @st.cache_resource
 def load_hindi_model():
-    """Load the Hindi GPT-2 model"""
+    """Load the Hindi GPT-2 tokenizer and model"""
     try:
         with st.spinner("🤖 हिंदी मॉडल लोड हो रहा है..."):
-            model = pipeline(
-                "text-generation",
-                model=MODEL_NAME,
-                tokenizer=MODEL_NAME,
-                framework="pt",
-                device=-1,  # Use CPU
-                return_full_text=True
+            tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+            
+            if ORTModelForCausalLM is not None:
+                # ONNX Runtime with all graph fusions enabled
+                options = ort.SessionOptions()
+                options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                options.intra_op_num_threads = CPU_THREADS
+                
+                if os.path.isdir(ONNX_DIR):
+                    model = ORTModelForCausalLM.from_pretrained(
+                        ONNX_DIR, session_options=options
+                    )
+                else:
+                    model = ORTModelForCausalLM.from_pretrained(
+                        MODEL_NAME, export=True, session_options=options
+                    )
+                    model.save_pretrained(ONNX_DIR)
+            else:
+                model = AutoModelForCausalLM.from_pretrained(MODEL_NAME).to(DEVICE)
+                model.eval()
+                
+                # INT8 dynamic quantization of the attention and MLP projections
+                # for faster CPU decoding. The LM head is tied to the embeddings,
+                # so both stay in FP32.
+                projections = conv1d_to_linear(model)
+                model = torch.ao.quantization.quantize_dynamic(
+                    model, projections, dtype=torch.qint8
+                )
+            
+            # Newer transformers releases dropped group (diverse) beam
+            # search; probe it once with a one-token run and fall back to
+            # plain beam search if it is unavailable
+            beam_groups = N_SUGGESTIONS
+            try:
+                probe = tokenizer("नमस्ते", return_tensors="pt").to(DEVICE)
+                with torch.inference_mode():
+                    model.generate(
+                        **probe,
+                        max_new_tokens=1,
+                        num_beams=2,
+                        num_beam_groups=2,
+                        diversity_penalty=DIVERSITY_PENALTY,
+                        pad_token_id=tokenizer.eos_token_id
+                    )
+            except Exception:
+                beam_groups = 1
+            
+            # Generation settings are built once here instead of being
+            # merged from keyword arguments on every generate() call
+            model.generation_config = GenerationConfig(
+                max_new_tokens=MAX_NEW_TOKENS,
+                num_beams=N_SUGGESTIONS,
+                num_beam_groups=beam_groups,
+                num_return_sequences=N_SUGGESTIONS,
+                diversity_penalty=DIVERSITY_PENALTY if beam_groups > 1 else 0.0,
+                do_sample=False,
+                early_stopping=True,
+                pad_token_id=tokenizer.eos_token_id,
+                eos_token_id=tokenizer.eos_token_id
             )
-        return model
+            
+            if ORTModelForCausalLM is None and hasattr(torch, "compile"):
+                # Compile the forward pass and warm it up on two context
+                # lengths; keep eager mode if this PyTorch build cannot
+                # compile the quantized model. The warmup uses short greedy
+                # runs because a full grouped beam search here would add
+                # noticeably to cold start. Later recompile failures are
+                # handled in generate_once().
+                eager_forward = model.forward
+                model.forward = torch.compile(eager_forward, dynamic=True)
+                model.eager_forward = eager_forward
+                try:
+                    with torch.inference_mode():
+                        for warmup_text in ("नमस्ते", "आज मौसम बहुत अच्छा है"):
+                            warmup = tokenizer(warmup_text, return_tensors="pt").to(DEVICE)
+                            model.generate(
+                                **warmup,
+                                max_new_tokens=2,
+                                num_beams=1,
+                                num_beam_groups=1,
+                                num_return_sequences=1,
+                                diversity_penalty=0.0
+                            )
+                except Exception:
+                    model.forward = model.__dict__.pop("eager_forward", eager_forward)
+        return tokenizer, model
     except Exception as e:
         st.error(f"❌ मॉडल लोड नहीं हो सका: {str(e)}")
-        return None
+        return None, None
+
+tokenizer, model = load_hindi_model()
+
+@st.cache_resource
+def load_token_id_sets(_tokenizer):
+    """Ids of BPE tokens that contain a space, and of tokens that add a letter"""
+    if not _tokenizer:
+        return frozenset(), frozenset()
+    space_ids = set()
+    letter_ids = set()
+    for t, i in _tokenizer.get_vocab().items():
+        if t.startswith("Ġ") or " " in t:
+            space_ids.add(i)
+        # Byte-level tokens can hold part of a Devanagari character, which
+        # decodes to U+FFFD; those still belong to a word
+        decoded = _tokenizer.convert_tokens_to_string([t])
+        if _HAS_LETTER_RE.search(decoded) or "\ufffd" in decoded:
+            letter_ids.add(i)
+    return frozenset(space_ids), frozenset(letter_ids)
 
-generator = load_hindi_model()
+# Token ids looked up once instead of on every generation step
+SPACE_TOKEN_IDS, LETTER_TOKEN_IDS = load_token_id_sets(tokenizer)
 
 # ------------------------
 # HELPER FUNCTIONS
@@ -160,14 +322,16 @@ def clean_suggestion(text):
     if not text:
         return ""
     
-    # Remove extra whitespace and punctuation from ends
-    cleaned = text.strip()
+    # Remove whitespace and common punctuation from ends
+    cleaned = text.strip(_STRIP_CHARS)
     
-    # Remove leading/trailing punctuation except Hindi punctuation
-    cleaned = re.sub(r'^[^\u0900-\u097Fa-zA-Z0-9]+|[^\u0900-\u097Fa-zA-Z0-9।]+$', '', cleaned)
+    # Anything else left at an end that is not Devanagari or alphanumeric
+    # (symbols, emoji, ...) goes through the full regex
+    if cleaned and not (_WORD_CHAR_RE.match(cleaned[0]) and _WORD_CHAR_RE.match(cleaned[-1])):
+        cleaned = _END_STRIP_RE.sub('', cleaned)
     
     # Must contain at least one letter
-    if not re.search(r'[\u0900-\u097Fa-zA-Z]', cleaned):
+    if not _HAS_LETTER_RE.search(cleaned):
         return ""
     
     # Must be at least 2 characters
@@ -176,18 +340,18 @@ def clean_suggestion(text):
         
     return cleaned
 
-def extract_suggestions(generated_text, original_text):
-    """Extract next word suggestions from generated text"""
-    if not generated_text or len(generated_text) <= len(original_text):
+def extract_suggestions(generated_text):
+    """Extract next word suggestions from the generated continuation"""
+    if not generated_text:
         return []
     
-    # Get the newly generated part
-    new_part = generated_text[len(original_text):].strip()
+    # Only the newly generated part is decoded, so no prefix slicing needed
+    new_part = generated_text.strip()
     if not new_part:
         return []
     
-    # Split into words and clean them
-    words = new_part.split()
+    # Split on whitespace and punctuation, then clean the words
+    words = _WORD_SPLIT_RE.split(new_part)
     suggestions = []
     
     for word in words[:6]:  # Take first 6 words
@@ -197,53 +361,147 @@ def extract_suggestions(generated_text, original_text):
     
     return suggestions[:N_SUGGESTIONS]
 
-def generate_predictions(text):
-    """Generate word predictions using the model"""
-    if not generator or not text:
+class WordBoundaryStop(StoppingCriteria):
+    """Stop generating once every sequence has finished its first new word"""
+    
+    def __init__(self, space_token_ids, letter_token_ids, prefix_len):
+        self.space_token_ids = space_token_ids
+        self.letter_token_ids = letter_token_ids
+        self.prefix_len = prefix_len
+    
+    def row_done(self, row):
+        """A space token after some letters means the first word is complete"""
+        seen_word = False
+        for tid in row:
+            if seen_word and tid in self.space_token_ids:
+                return True
+            if tid in self.letter_token_ids:
+                seen_word = True
+        return False
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        # Leading punctuation or bare spaces do not start the first word
+        new_ids = input_ids[:, self.prefix_len:].tolist()
+        done = all(self.row_done(row) for row in new_ids)
+        return torch.full((input_ids.shape[0],), done, dtype=torch.bool, device=input_ids.device)
+
+def diverse_beams_enabled():
+    """Whether generation uses grouped (diverse) beam search"""
+    return model is not None and model.generation_config.num_beam_groups > 1
+
+def generate_once(input_ids, kwargs):
+    """Call model.generate, dropping back to eager mode if compilation fails"""
+    try:
+        return model.generate(input_ids, **kwargs)
+    except _COMPILE_ERRORS:
+        # A recompile for a new context length failed; stay eager from now
+        # on. The model is shared by all sessions, so another one may have
+        # already switched back, in which case there is nothing to pop.
+        eager_forward = model.__dict__.pop("eager_forward", None)
+        if eager_forward is not None:
+            model.forward = eager_forward
+        return model.generate(input_ids, **kwargs)
+
+def run_generate(encoded, variant):
+    """Run beam search with the settings chosen at load time"""
+    kwargs = {
+        "attention_mask": encoded.attention_mask,
+        "stopping_criteria": StoppingCriteriaList(
+            [WordBoundaryStop(SPACE_TOKEN_IDS, LETTER_TOKEN_IDS, encoded.input_ids.shape[1])]
+        ),
+    }
+    if diverse_beams_enabled():
+        # A stronger penalty pushes the groups apart for "new suggestions"
+        kwargs["diversity_penalty"] = DIVERSITY_PENALTY * (1 + variant)
+    
+    return generate_once(encoded.input_ids, kwargs)
+
+@st.cache_data(show_spinner=False, max_entries=512)
+def _cached_predict(context, variant=0):
+    """Raw suggestion candidates for a context, memoized across reruns"""
+    encoded = tokenizer(context, return_tensors="pt").to(DEVICE)
+    ids = encoded.input_ids
+    
+    # Diverse beam search: one group per suggestion gives N_SUGGESTIONS
+    # different continuations in a single deterministic pass (their first
+    # words can still repeat, so callers dedup)
+    with torch.inference_mode():
+        out = run_generate(encoded, variant)
+    
+    # Decode only the newly generated tokens
+    results = tokenizer.batch_decode(out[:, ids.shape[1]:], skip_special_tokens=True)
+    
+    # The next word of each beam is one suggestion
+    all_suggestions = []
+    for result in results:
+        suggestions = extract_suggestions(result)
+        if suggestions:
+            all_suggestions.append(suggestions[0])
+    
+    return all_suggestions
+
+def generate_predictions(words, variant=0):
+    """Generate word predictions using the model from the typed words"""
+    if not model or not words:
         return []
     
     try:
         # Use last few words for better context
-        words = text.strip().split()
-        context = " ".join(words[-6:]) if len(words) > 6 else text.strip()
+        context = " ".join(words[-6:])
         
-        # Generate multiple sequences
-        results = generator(
-            context,
-            max_new_tokens=MAX_NEW_TOKENS,
-            num_return_sequences=N_SUGGESTIONS + 2,
-            do_sample=True,
-            top_k=TOP_K,
-            top_p=TOP_P,
-            temperature=TEMPERATURE,
-            pad_token_id=generator.tokenizer.eos_token_id
-        )
+        # Same context (e.g. after retyping) reuses the earlier generation
+        all_suggestions = _cached_predict(context, variant)
         
-        # Extract suggestions from all results
-        all_suggestions = []
-        for result in results:
-            suggestions = extract_suggestions(result['generated_text'], context)
-            all_suggestions.extend(suggestions)
-        
-        # Remove duplicates and filter
-        unique_suggestions = []
+        # Drop repeated suggestions and words already in the text
+        text_tokens = set(w.lower() for w in words)
         seen = set()
+        unique_suggestions = []
         
         for suggestion in all_suggestions:
-            if (suggestion and 
-                suggestion.lower() not in seen and 
-                suggestion not in text and  # Don't repeat existing words
-                len(suggestion) >= 2):
-                
-                unique_suggestions.append(suggestion)
-                seen.add(suggestion.lower())
+            suggestion_lower = suggestion.lower()
+            if suggestion_lower in seen or suggestion_lower in text_tokens:
+                continue
+            seen.add(suggestion_lower)
+            unique_suggestions.append(suggestion)
+            if len(unique_suggestions) == N_SUGGESTIONS:
+                break
         
-        return unique_suggestions[:N_SUGGESTIONS]
+        return unique_suggestions
         
     except Exception as e:
         st.error(f"सुझाव बनाने में समस्या: {str(e)}")
         return []
 
+def analyze_text(text):
+    """Word, character and sentence statistics computed in one pass"""
+    sentences = [s.strip() for s in _SENT_SPLIT_RE.split(text) if s.strip()]
+    words = text.split()
+    return {
+        "n_sents": len(sentences),
+        "n_words": len(words),
+        "n_chars": len(text),
+        "sents": sentences,
+        "avg": sum(len(s.split()) for s in sentences) / max(1, len(sentences)),
+    }
+
+def add_suggestion(suggestion):
+    """Append a clicked suggestion to the text (runs as a button callback)"""
+    current_text = st.session_state.user_text.strip()
+    
+    # Add suggestion to text
+    if not current_text:
+        new_text = suggestion
+    else:
+        new_text = current_text + ' ' + suggestion
+    
+    # Update session state
+    st.session_state.user_text = new_text
+    st.session_state.rev += 1
+    st.session_state.suggestion_history.append(suggestion)
+    
+    # Show non-blocking feedback
+    st.toast(f"✅ '{suggestion}' जोड़ा गया!")
+
 def should_predict(text):
     """Check if we should show predictions"""
     if not text or len(text.strip()) < 1:
@@ -264,13 +522,17 @@ if "suggestion_history" not in st.session_state:
     st.session_state.suggestion_history = []
 if "word_count" not in st.session_state:
     st.session_state.word_count = 0
+if "rev" not in st.session_state:
+    st.session_state.rev = 0  # Bumped whenever user_text is changed by the app
+if "refresh" not in st.session_state:
+    st.session_state.refresh = ("", 0)  # (text, times "new suggestions" was clicked)
 
 # ------------------------
 # MAIN INTERFACE
 # ------------------------
 
-# Text input area - Force refresh when session state changes
-input_key = f"main_input_{len(st.session_state.user_text)}_{hash(st.session_state.user_text)}"
+# Text input area - A new revision forces refresh when session state changes
+input_key = f"main_input_{st.session_state.rev}"
 
 user_input = st.text_input(
     "यहाँ हिंदी में लिखना शुरू करें...",
@@ -280,11 +542,22 @@ user_input = st.text_input(
     key=input_key
 )
 
-# Update session state only if user typed (not from button clicks)
+# Update session state only if user typed (not from button clicks).
+# The widget already shows typed text, so the revision stays the same.
 if user_input != st.session_state.user_text:
     st.session_state.user_text = user_input
     st.session_state.word_count = len(user_input.split()) if user_input else 0
 
+# Split the current text once per rerun
+_ut = st.session_state.user_text
+_ut_stripped = _ut.strip()
+_words = _ut_stripped.split()
+
+# "New suggestions" clicks only apply to the text they were made on
+_refresh_text, _variant = st.session_state.refresh
+if _refresh_text != _ut:
+    _variant = 0
+
 # Display current text in a visible format if there's accumulated text
 if st.session_state.user_text:
     st.markdown(f"""
@@ -304,20 +577,23 @@ if st.session_state.user_text:
     </div>
     """, unsafe_allow_html=True)
 
+# Text statistics, shared by the stats row and the analysis expander
+stats = analyze_text(_ut)
+
 # Show current stats
 if st.session_state.user_text:
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("शब्द", len(st.session_state.user_text.split()))
+        st.metric("शब्द", stats["n_words"])
     with col2:
-        st.metric("अक्षर", len(st.session_state.user_text))
+        st.metric("अक्षर", stats["n_chars"])
     with col3:
-        st.metric("वाक्य", len([s for s in re.split(r'[।.!?]+', st.session_state.user_text) if s.strip()]))
+        st.metric("वाक्य", stats["n_sents"])
 
 # Generate and display suggestions
-if should_predict(st.session_state.user_text) and generator:
+if should_predict(_ut) and model:
     with st.spinner("💭 सुझाव तैयार हो रहे हैं..."):
-        suggestions = generate_predictions(st.session_state.user_text)
+        suggestions = generate_predictions(_words, _variant)
     
     if suggestions:
         st.markdown("""
@@ -328,40 +604,26 @@ if should_predict(st.session_state.user_text) and generator:
         </div>
         """, unsafe_allow_html=True)
         
-        # Create suggestion buttons
-        cols = st.columns(len(suggestions))
-        
-        for i, suggestion in enumerate(suggestions):
-            with cols[i]:
-                # Unique key for each suggestion
-                button_key = f"suggest_{i}_{hash(suggestion + st.session_state.user_text)}_{len(st.session_state.user_text)}"
-                
-                if st.button(
-                    f"➕ {suggestion}",
-                    key=button_key,
-                    help=f"'{suggestion}' जोड़ें",
-                    use_container_width=True
-                ):
-                    # Add suggestion to text
-                    current_text = st.session_state.user_text.strip()
-                    
-                    if not current_text:
-                        new_text = suggestion
-                    elif current_text.endswith(' '):
-                        new_text = current_text + suggestion
-                    else:
-                        new_text = current_text + ' ' + suggestion
-                    
-                    # Update session state
-                    st.session_state.user_text = new_text
-                    st.session_state.suggestion_history.append(suggestion)
-                    
-                    # Show immediate feedback
-                    st.success(f"✅ '{suggestion}' जोड़ा गया!")
+        # Suggestion buttons share one form, so a click submits a single rerun
+        with st.form(f"suggestions_{st.session_state.rev}", border=False):
+            # Create suggestion buttons
+            cols = st.columns(len(suggestions))
+            
+            for i, suggestion in enumerate(suggestions):
+                with cols[i]:
+                    # Suggestions are unique per rerun, so index + revision is enough
+                    button_key = f"s_{st.session_state.rev}_{i}"
                     
-                    # Force refresh to update input and show new suggestions
-                    time.sleep(0.3)  # Brief pause to show success message
-                    st.rerun()
+                    # The callback updates the text before the rerun, so the
+                    # click needs no extra st.rerun()
+                    st.form_submit_button(
+                        f"➕ {suggestion}",
+                        key=button_key,
+                        help=f"'{suggestion}' जोड़ें",
+                        use_container_width=True,
+                        on_click=add_suggestion,
+                        args=(suggestion,)
+                    )
 
 # Action buttons
 st.markdown("---")
@@ -370,7 +632,9 @@ col1, col2, col3, col4 = st.columns(4)
 
 with col1:
     if st.button("🗑️ साफ़ करें", use_container_width=True):
-        st.session_state.user_text = ""
+        if st.session_state.user_text:
+            st.session_state.user_text = ""
+            st.session_state.rev += 1
         st.session_state.suggestion_history = []
         st.rerun()
 
@@ -378,6 +642,7 @@ with col2:
     if st.button("📝 पूर्ण विराम", use_container_width=True):
         if st.session_state.user_text and not st.session_state.user_text.endswith('।'):
             st.session_state.user_text += "। "
+            st.session_state.rev += 1
             st.rerun()
 
 with col3:
@@ -386,10 +651,14 @@ with col3:
         if words:
             words.pop()
             st.session_state.user_text = " ".join(words) + (" " if words else "")
+            st.session_state.rev += 1
             st.rerun()
 
 with col4:
-    if st.button("🔄 नए सुझाव", use_container_width=True):
+    # Beam search is deterministic, so new suggestions need a stronger
+    # diversity penalty; without beam groups there is nothing to vary
+    if diverse_beams_enabled() and st.button("🔄 नए सुझाव", use_container_width=True):
+        st.session_state.refresh = (_ut, _variant + 1)
         st.rerun()
 
 # Show suggestion history
@@ -403,14 +672,13 @@ if st.session_state.suggestion_history:
 # Text analysis
 if st.session_state.user_text:
     with st.expander("🔍 टेक्स्ट विश्लेषण"):
-        sentences = [s.strip() for s in re.split(r'[।.!?]+', st.session_state.user_text) if s.strip()]
+        sentences = stats["sents"]
         
         col1, col2 = st.columns(2)
         with col1:
-            st.write(f"**कुल वाक्य:** {len(sentences)}")
+            st.write(f"**कुल वाक्य:** {stats['n_sents']}")
             if sentences:
-                avg_words = sum(len(s.split()) for s in sentences) / len(sentences)
-                st.write(f"**औसत शब्द प्रति वाक्य:** {avg_words:.1f}")
+                st.write(f"**औसत शब्द प्रति वाक्य:** {stats['avg']:.1f}")
         
         with col2:
             if sentences: